@@ -2,22 +2,232 @@
 """
 题库生成网站 - Flask后端（异步任务版）
 """
+import functools
 import json
 import os
+import re
 import shutil
+import selectors
+import secrets
 import subprocess
-import threading
-import uuid
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, send_from_directory
+
+try:
+    # C 扩展序列化，比标准库快 3-10 倍；没装则回退标准库
+    import orjson
+except ImportError:
+    orjson = None
 
 app = Flask(__name__)
+# 前置了支持 X-Sendfile 的反向代理时开启：send_from_directory 只发头，
+# 文件本体由代理 sendfile(2) 零拷贝发送，不再流经 Python
+app.use_x_sendfile = bool(os.environ.get('TIMU_USE_X_SENDFILE'))
+
+
+def _json_dumps(obj):
+    """序列化为 UTF-8 bytes（带缩进，保持磁盘文件可读）"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+
+def _json_loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _atomic_write_bytes(path, data):
+    """写临时文件后 os.replace，轮询端永远读不到写了一半的 JSON"""
+    tmp = path.with_suffix(path.suffix + '.tmp')
+    fd = os.open(str(tmp), os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+    os.replace(str(tmp), str(path))
 
-BASE_DIR = Path("/root/projects/timu")
-DATA_DIR = Path("/root/.openclaw/workspace/data/timu")
+
+def _json_response(payload, status=200):
+    """绕过 jsonify 的包装开销，直接构造 JSON 响应"""
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    return app.response_class(body, status=status, mimetype='application/json')
+
+# 路径走环境变量，不同部署布局共用同一份代码
+BASE_DIR = Path(os.environ.get('TIMU_BASE_DIR', '/root/projects/timu'))
+DATA_DIR = Path(os.environ.get('TIMU_DATA_DIR', '/root/.openclaw/workspace/data/timu'))
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# 有界线程池：限制并发 builder 数量，复用线程
+EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix='builder')
+
+# 预编译正则，避免热循环内反复查缓存
+_Q_RE = re.compile(r'题目处理\s+(\d+)/(\d+)')
+_KP_RE = re.compile(r'知识点处理\s+(\d+)/(\d+)')
+_OG_RE = re.compile(r'property=["\']og:title["\']\s+content=["\']([^"\']+)["\']')
+_SUFFIX_RE = re.compile(r'\s*[|｜]\s*芝士架构$')
+
+_NEXT_DATA_MARKER = '<script id="__NEXT_DATA__" type="application/json">'
+
+# builder 输出里进度行的 UTF-8 字节标记：先在 bytes 上筛，
+# 非进度行连解码都省掉
+_Q_MARK = '题目处理'.encode('utf-8')
+_KP_MARK = '知识点处理'.encode('utf-8')
+_STAGE_MARK = '开始处理'.encode('utf-8')
+_KP_WORD = '知识点'.encode('utf-8')
+
+
+def _extract_next_data(html_content):
+    """定位 __NEXT_DATA__ 脚本并解析 JSON，找不到返回 None
+
+    用子串定位 + 切片代替 DOTALL 正则，大页面上快一个量级。
+    """
+    i = html_content.find(_NEXT_DATA_MARKER)
+    if i < 0:
+        return None
+    start = i + len(_NEXT_DATA_MARKER)
+    j = html_content.find('</script>', start)
+    if j < 0:
+        return None
+    try:
+        return _json_loads(html_content[start:j])
+    except (ValueError, TypeError):
+        return None
+
+
+def _extract_tag_title(html_content):
+    """从 <title> 标签提取标题，失败回退 og:title，返回 '' 表示没找到"""
+    i = html_content.find('<title>')
+    if i >= 0:
+        j = html_content.find('</title>', i + 7)
+        if j > 0:
+            return html_content[i + 7:j].strip()
+    og_match = _OG_RE.search(html_content)
+    if og_match:
+        return og_match.group(1).strip()
+    return ''
+
+
+def _extract_title_streaming(path, max_bytes=2_000_000):
+    """从抓取的 HTML 提取页面标题，只读必要的字节，不整页载入内存
+
+    先读前缀找 __NEXT_DATA__；Next.js 把它放在 body 末尾，
+    大文件前缀没命中时补读尾部一段，最后回退 <title> / og:title。
+    """
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        html_content = f.read(max_bytes).decode('utf-8', 'replace')
+
+    next_data = _extract_next_data(html_content)
+    if next_data is None and size > max_bytes:
+        with open(path, 'rb') as f:
+            f.seek(size - max_bytes)
+            tail = f.read(max_bytes).decode('utf-8', 'replace')
+        next_data = _extract_next_data(tail)
+
+    # 优先从 __NEXT_DATA__ 提取更精确的标题
+    if next_data is not None:
+        page_props = next_data.get("props", {}).get("pageProps", {})
+        test_meta = page_props.get("test", {})
+        source_list = test_meta.get("selects") or test_meta.get("cases") or []
+        if source_list:
+            first_item = source_list[0] or {}
+            paper_name = (first_item.get("paper") or {}).get("name") or test_meta.get("paperName") or ""
+            kp_name = first_item.get("kpName") or ""
+            if paper_name and kp_name:
+                return f"{paper_name} - {kp_name}"
+            if paper_name:
+                return paper_name
+            if kp_name:
+                return kp_name
+
+    # 回退：从 <title> 标签提取
+    full_title = _extract_tag_title(html_content)
+    if full_title:
+        # 去掉网站名后缀
+        full_title = _SUFFIX_RE.sub('', full_title)
+        parts = full_title.split(' - ')
+        if len(parts) >= 3:
+            return f"{parts[0].strip()} - {parts[-2].strip()}"
+        return full_title
+    return ""
+
+# 按 mtime 缓存抓取配置，改配置无需重启
+_CONFIG_CACHE = {'mtime': 0, 'data': None, 'model_list': None}
+
+
+def _load_fetcher_config():
+    p = BASE_DIR / "config" / "cheko_fetcher_config.json"
+    m = p.stat().st_mtime
+    if _CONFIG_CACHE['mtime'] != m:
+        data = _json_loads(p.read_bytes())
+        _CONFIG_CACHE['data'] = data
+        _CONFIG_CACHE['model_list'] = [
+            {
+                'name': name,
+                'model': model_config.get('model', ''),
+                'base_url': model_config.get('base_url', '')
+            }
+            for name, model_config in data.get('models', {}).items()
+        ]
+        _CONFIG_CACHE['mtime'] = m
+    return _CONFIG_CACHE['data']
+
+
+def _list_site_files(task_dir):
+    """列出 site 目录下全部文件，相对 task_dir 的排序路径"""
+    site_dir = task_dir / 'site'
+    files = []
+    for root, _, names in os.walk(site_dir):
+        rel_root = os.path.relpath(root, task_dir)
+        files.extend(os.path.join(rel_root, n) for n in names)
+    files.sort()
+    return files
+
+
+@functools.lru_cache(maxsize=512)
+def _read_json_cached(path_str, mtime):
+    """按 (路径, mtime) 缓存解析结果；文件更新后 mtime 变化自动失效"""
+    return _json_loads(Path(path_str).read_bytes())
+
+
+@functools.lru_cache(maxsize=512)
+def _quiz_paper_name(path_str, mtime):
+    """只缓存标题字符串；动辄数 MB 的 quiz_data 解析完即回收，不进缓存"""
+    data = _json_loads(Path(path_str).read_bytes())
+    return data.get('meta', {}).get('paper_name', '')
+
+
+def _wait_for_progress(info_file, progress_file, timeout=25.0, interval=0.25):
+    """阻塞到任一文件的 mtime 变化或超时
+
+    用文件 mtime 做信号而不是进程内的 Condition：gunicorn 多 worker
+    部署下 run_task 和长轮询请求大概率不在同一进程，mtime 是唯一
+    跨进程可见的进度信号。
+    """
+    def stamp():
+        s = []
+        for p in (info_file, progress_file):
+            try:
+                s.append(p.stat().st_mtime_ns)
+            except OSError:
+                s.append(0)
+        return s
+
+    start = stamp()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(interval)
+        if stamp() != start:
+            return
+
 
 def run_task(task_id: str, url: str, html_path: Path, question_type: str = 'choice', model_config: str = None):
     """后台线程：运行 builder"""
@@ -31,20 +241,30 @@ def run_task(task_id: str, url: str, html_path: Path, question_type: str = 'choi
     else:
         prompt_file = BASE_DIR / "prompts" / "question.md"
 
+    # info.json 只在进入任务时读一次，之后在内存中维护，
+    # 状态更新不再走磁盘读（title 等已有字段自然保留）
+    info_file = task_dir / 'info.json'
+    if info_file.exists():
+        info_state = _json_loads(info_file.read_bytes())
+    else:
+        info_state = {'id': task_id, 'url': url, 'created_at': datetime.now().isoformat()}
+
     def save_info(status, error=''):
-        info_file = task_dir / 'info.json'
-        # 保留已有字段（如 title），只更新 status 和 error
-        if info_file.exists():
-            info = json.loads(info_file.read_text(encoding='utf-8'))
-        else:
-            info = {'id': task_id, 'url': url, 'created_at': datetime.now().isoformat()}
-        info['status'] = status
+        info_state['status'] = status
         if error:
-            info['error'] = error
-        info_file.write_text(
-            json.dumps(info, ensure_ascii=False, indent=2), encoding='utf-8')
+            info_state['error'] = error
+        _atomic_write_bytes(info_file, _json_dumps(info_state))
+
+    last_write = 0.0
 
     def save_progress(stage, current, total, message=''):
+        # 合并高频进度写入：前端轮询间隔远大于 0.5s，
+        # 中间状态最多每 0.5s 落盘一次，终态（完成/失败/阶段结束）必写
+        nonlocal last_write
+        now = time.monotonic()
+        if current != total and stage not in ('完成', '失败') and now - last_write < 0.5:
+            return
+        last_write = now
         progress = {
             'stage': stage,
             'current': current,
@@ -52,8 +272,7 @@ def run_task(task_id: str, url: str, html_path: Path, question_type: str = 'choi
             'message': message,
             'percent': int(current * 100 / total) if total > 0 else 0
         }
-        (task_dir / 'progress.json').write_text(
-            json.dumps(progress, ensure_ascii=False, indent=2), encoding='utf-8')
+        _atomic_write_bytes(task_dir / 'progress.json', _json_dumps(progress))
 
     save_info('building')
     save_progress('初始化', 0, 100, '正在启动...')
@@ -71,50 +290,74 @@ def run_task(task_id: str, url: str, html_path: Path, question_type: str = 'choi
     if model_config:
         build_cmd.extend(["--model-config", model_config])
 
+    def handle_line(line):
+        # 绝大多数行是普通日志，先用子串判断再进正则引擎
+        # 解析题目处理进度: [######------] 题目处理 5/10
+        if '题目处理' in line:
+            q_match = _Q_RE.search(line)
+            if q_match:
+                save_progress('生成题目解析', int(q_match.group(1)), int(q_match.group(2)),
+                            f'AI 解析题目中... {q_match.group(1)}/{q_match.group(2)}')
+            return
+
+        # 解析知识点处理进度
+        if '知识点处理' in line:
+            kp_match = _KP_RE.search(line)
+            if kp_match:
+                save_progress('生成知识点总结', int(kp_match.group(1)), int(kp_match.group(2)),
+                            f'AI 总结知识点中... {kp_match.group(1)}/{kp_match.group(2)}')
+            return
+
+        # 检测是否开始新阶段
+        if '开始处理' in line and '知识点' in line:
+            save_progress('分析知识点', 0, 1, '正在分析知识点...')
+
     try:
-        # 使用 Popen 以便实时读取输出
+        # 使用 Popen 以便实时读取输出；两条管道都注册到 selector，
+        # 避免 builder 写满 stderr 缓冲区后死锁
         process = subprocess.Popen(
-            build_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-            text=True, bufsize=1
+            build_cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
         )
-        
-        # 解析输出中的进度
-        import re
-        question_total = 0
-        question_done = 0
-        knowledge_total = 0
-        knowledge_done = 0
-        
-        for line in process.stdout:
-            # 解析题目处理进度: [######------] 题目处理 5/10
-            q_match = re.search(r'题目处理\s+(\d+)/(\d+)', line)
-            if q_match:
-                question_done = int(q_match.group(1))
-                question_total = int(q_match.group(2))
-                save_progress('生成题目解析', question_done, question_total, 
-                            f'AI 解析题目中... {question_done}/{question_total}')
-                continue
-                
-            # 解析知识点处理进度
-            kp_match = re.search(r'知识点处理\s+(\d+)/(\d+)', line)
-            if kp_match:
-                knowledge_done = int(kp_match.group(1))
-                knowledge_total = int(kp_match.group(2))
-                save_progress('生成知识点总结', knowledge_done, knowledge_total,
-                            f'AI 总结知识点中... {knowledge_done}/{knowledge_total}')
-                continue
-                
-            # 检测是否开始新阶段
-            if '开始处理' in line and '知识点' in line:
-                save_progress('分析知识点', 0, 1, '正在分析知识点...')
-        
+
+        sel = selectors.DefaultSelector()
+        os.set_blocking(process.stdout.fileno(), False)
+        os.set_blocking(process.stderr.fileno(), False)
+        sel.register(process.stdout, selectors.EVENT_READ, 'stdout')
+        sel.register(process.stderr, selectors.EVENT_READ, 'stderr')
+
+        stdout_buf = b''
+        stderr_tail = b''  # 只保留末尾，供失败时上报
+
+        while sel.get_map():
+            for key, _ in sel.select():
+                chunk = os.read(key.fileobj.fileno(), 65536)
+                if not chunk:
+                    sel.unregister(key.fileobj)
+                    continue
+                if key.data == 'stderr':
+                    stderr_tail = (stderr_tail + chunk)[-500:]
+                    continue
+                stdout_buf += chunk
+                *lines, stdout_buf = stdout_buf.split(b'\n')
+                for raw in lines:
+                    if _Q_MARK in raw or _KP_MARK in raw or (
+                            _STAGE_MARK in raw and _KP_WORD in raw):
+                        handle_line(raw.decode('utf-8', 'replace'))
+        sel.close()
+        if stdout_buf and (_Q_MARK in stdout_buf or _KP_MARK in stdout_buf or (
+                _STAGE_MARK in stdout_buf and _KP_WORD in stdout_buf)):
+            handle_line(stdout_buf.decode('utf-8', 'replace'))
+
         process.wait(timeout=1800)
-        
+
         if process.returncode == 0:
+            # 固化文件清单，轮询端不用每次递归扫目录
+            _atomic_write_bytes(task_dir / 'files.json',
+                                _json_dumps(_list_site_files(task_dir)))
             save_info('completed')
             save_progress('完成', 1, 1, '生成完成！')
         else:
-            save_info('failed', process.stderr.read()[-500:] if process.stderr else '')
+            save_info('failed', stderr_tail.decode('utf-8', 'replace'))
             save_progress('失败', 0, 1, '生成失败')
             
     except subprocess.TimeoutExpired:
@@ -134,23 +377,10 @@ def index():
 def get_models():
     """获取可用的模型配置列表"""
     try:
-        fetcher_config = BASE_DIR / "config" / "cheko_fetcher_config.json"
-        with open(fetcher_config, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-        
-        models = config.get('models', {})
-        # 构建模型列表
-        model_list = []
-        for name, model_config in models.items():
-            model_list.append({
-                'name': name,
-                'model': model_config.get('model', ''),
-                'base_url': model_config.get('base_url', '')
-            })
-        
-        return jsonify({'success': True, 'models': model_list})
+        _load_fetcher_config()
+        return _json_response({'success': True, 'models': _CONFIG_CACHE['model_list']})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e), 'models': []})
+        return _json_response({'success': False, 'error': str(e), 'models': []})
 
 
 @app.route('/api/generate', methods=['POST'])
@@ -160,9 +390,9 @@ def generate():
     question_type = data.get('question_type', 'choice')  # choice or answer
     model_config = data.get('model_config', None)  # 模型配置名称
     if not url:
-        return jsonify({'success': False, 'error': '请输入URL'})
+        return _json_response({'success': False, 'error': '请输入URL'})
 
-    task_id = str(uuid.uuid4())[:8]
+    task_id = secrets.token_hex(4)
     task_dir = DATA_DIR / task_id
     task_dir.mkdir(exist_ok=True)
 
@@ -170,157 +400,133 @@ def generate():
     fetcher_script = BASE_DIR / "scripts" / "cheko_fetcher.py"
 
     try:
-        with open(fetcher_config, 'r', encoding='utf-8') as f:
-            config = json.load(f)
+        config = _load_fetcher_config()
 
-        fetch_cmd = [
-            "python3", str(fetcher_script),
-            "-o", str(task_dir / "output.txt"),
-            url
-        ]
+        fetch_cmd = ["python3", str(fetcher_script)]
         cookie = config.get('cookie', '')
         if cookie:
-            fetch_cmd = fetch_cmd[:2] + ["--cookie", cookie] + fetch_cmd[2:]
-
-        result = subprocess.run(fetch_cmd, capture_output=True, text=True, timeout=120)
+            fetch_cmd += ["--cookie", cookie]
+        fetch_cmd += ["-o", str(task_dir / "output.txt"), url]
+
+        # 把配置路径递给子进程，后续 Python 调用不用各自猜配置位置
+        fetch_env = dict(os.environ, CHEKO_CONFIG_JSON=str(fetcher_config))
+        # 成功路径用不到输出：stdout 直接丢弃，stderr 保持 bytes，
+        # 只在失败时解码末尾 300 字节
+        result = subprocess.run(fetch_cmd, stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE, timeout=120, env=fetch_env)
         if result.returncode != 0:
-            return jsonify({'success': False, 'error': f'抓取失败: {result.stderr[:300]}'})
+            err = result.stderr[-300:].decode('utf-8', 'replace') if result.stderr else ''
+            return _json_response({'success': False, 'error': f'抓取失败: {err}'})
 
         html_files = list(task_dir.glob("*.html"))
         if not html_files:
-            return jsonify({'success': False, 'error': '未能抓取到内容，请检查URL或Cookie'})
+            return _json_response({'success': False, 'error': '未能抓取到内容，请检查URL或Cookie'})
 
         # 提取页面标题
-        page_title = ""
         try:
-            html_content = html_files[0].read_text(encoding='utf-8')
-            import re
-            
-            # 优先从 __NEXT_DATA__ 提取更精确的标题
-            next_data_match = re.search(r'<script id="__NEXT_DATA__" type="application/json">(.*?)</script>', html_content, re.DOTALL)
-            if next_data_match:
-                next_data = json.loads(next_data_match.group(1))
-                page_props = next_data.get("props", {}).get("pageProps", {})
-                test_meta = page_props.get("test", {})
-                source_list = test_meta.get("selects") or test_meta.get("cases") or []
-                if source_list:
-                    first_item = source_list[0] or {}
-                    paper_name = (first_item.get("paper") or {}).get("name") or test_meta.get("paperName") or ""
-                    kp_name = first_item.get("kpName") or ""
-                    if paper_name and kp_name:
-                        page_title = f"{paper_name} - {kp_name}"
-                    elif paper_name:
-                        page_title = paper_name
-                    elif kp_name:
-                        page_title = kp_name
-            
-            # 回退：从 <title> 标签提取
-            if not page_title:
-                title_match = re.search(r'<title>([^<]+)</title>', html_content, re.IGNORECASE)
-                if title_match:
-                    full_title = title_match.group(1).strip()
-                else:
-                    og_match = re.search(r'property=["\']og:title["\']\s+content=["\']([^"\']+)["\']', html_content)
-                    if og_match:
-                        full_title = og_match.group(1).strip()
-                    else:
-                        full_title = ""
-                
-                if full_title:
-                    # 去掉网站名后缀
-                    full_title = re.sub(r'\s*[|｜]\s*芝士架构$', '', full_title)
-                    parts = full_title.split(' - ')
-                    if len(parts) >= 3:
-                        page_title = f"{parts[0].strip()} - {parts[-2].strip()}"
-                    elif len(parts) == 2:
-                        page_title = full_title
-                    else:
-                        page_title = full_title
+            page_title = _extract_title_streaming(html_files[0])
         except Exception:
-            pass
+            page_title = ""
 
         # 保存初始状态
         info = {'id': task_id, 'url': url, 'title': page_title, 'question_type': question_type, 'model_config': model_config, 'created_at': datetime.now().isoformat(), 'status': 'building'}
-        (task_dir / 'info.json').write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding='utf-8')
+        _atomic_write_bytes(task_dir / 'info.json', _json_dumps(info))
 
         # 后台运行 builder
-        t = threading.Thread(target=run_task, args=(task_id, url, html_files[0], question_type, model_config), daemon=True)
-        t.start()
+        EXECUTOR.submit(run_task, task_id, url, html_files[0], question_type, model_config)
 
-        return jsonify({'success': True, 'task_id': task_id, 'status': 'building'})
+        return _json_response({'success': True, 'task_id': task_id, 'status': 'building'})
 
     except subprocess.TimeoutExpired:
-        return jsonify({'success': False, 'error': '抓取超时'})
+        return _json_response({'success': False, 'error': '抓取超时'})
     except Exception as e:
-        return jsonify({'success': False, 'error': str(e)})
+        return _json_response({'success': False, 'error': str(e)})
 
 
 @app.route('/api/task/<task_id>')
 def get_task(task_id):
     task_dir = DATA_DIR / task_id
     info_file = task_dir / 'info.json'
-    if not info_file.exists():
-        return jsonify({'error': '任务不存在'}), 404
+    try:
+        info_mtime = info_file.stat().st_mtime
+    except OSError:
+        return _json_response({'error': '任务不存在'}, 404)
 
-    info = json.loads(info_file.read_text(encoding='utf-8'))
+    # 缓存里是共享 dict，复制一份再往里加字段
+    info = dict(_read_json_cached(str(info_file), info_mtime))
+
+    # ?wait=1 长轮询：构建中的任务阻塞到下一次进度更新（或 25s 超时）
+    # 再返回，前端不必按固定间隔空转
+    if request.args.get('wait') and info.get('status') == 'building':
+        _wait_for_progress(info_file, task_dir / 'progress.json')
+        try:
+            info = dict(_read_json_cached(str(info_file), info_file.stat().st_mtime))
+        except OSError:
+            pass
 
     # 读取进度信息
     progress_file = task_dir / 'progress.json'
-    if progress_file.exists():
-        info['progress'] = json.loads(progress_file.read_text(encoding='utf-8'))
+    try:
+        info['progress'] = _read_json_cached(
+            str(progress_file), progress_file.stat().st_mtime)
+    except OSError:
+        pass
 
     # 读取题库标题
     site_dir = task_dir / 'site'
     quiz_data_file = site_dir / 'quiz_data.json'
-    if quiz_data_file.exists():
-        try:
-            quiz_data = json.loads(quiz_data_file.read_text(encoding='utf-8'))
-            info['title'] = quiz_data.get('meta', {}).get('paper_name', '')
-        except:
-            pass
+    try:
+        info['title'] = _quiz_paper_name(
+            str(quiz_data_file), quiz_data_file.stat().st_mtime)
+    except Exception:
+        pass
 
-    # 列出生成的文件
-    files = []
-    if site_dir.exists():
-        for f in site_dir.rglob('*'):
-            if f.is_file():
-                files.append(str(f.relative_to(task_dir)))
-    info['files'] = files
-    return jsonify(info)
+    # 列出生成的文件：完成的任务直接读固化的清单
+    files_index = task_dir / 'files.json'
+    try:
+        info['files'] = _read_json_cached(
+            str(files_index), files_index.stat().st_mtime)
+    except OSError:
+        info['files'] = _list_site_files(task_dir)
+    return _json_response(info)
 
 
 @app.route('/api/tasks')
 def list_tasks():
+    # scandir 一次拿到 d_type/stat，避免排序时反复 stat
+    entries = [(e.path, e.stat().st_mtime) for e in os.scandir(DATA_DIR) if e.is_dir()]
+    entries.sort(key=lambda t: t[1], reverse=True)
+
     tasks = []
-    for d in sorted(DATA_DIR.iterdir(), key=lambda x: x.stat().st_mtime, reverse=True):
-        if not d.is_dir():
+    for path, _ in entries:
+        info_path = os.path.join(path, 'info.json')
+        try:
+            info_mtime = os.stat(info_path).st_mtime
+        except OSError:
             continue
-        info_file = d / 'info.json'
-        if info_file.exists():
-            tasks.append(json.loads(info_file.read_text(encoding='utf-8')))
-    return jsonify(tasks)
+        tasks.append(_read_json_cached(info_path, info_mtime))
+    return _json_response(tasks)
 
 
 @app.route('/api/demo', methods=['POST'])
 def demo():
-    task_id = str(uuid.uuid4())[:8]
+    task_id = secrets.token_hex(4)
     task_dir = DATA_DIR / task_id
     task_dir.mkdir(exist_ok=True)
 
     sample_html = BASE_DIR / "sample_input" / "cheko_673625.html"
     if not sample_html.exists():
-        return jsonify({'success': False, 'error': '示例文件不存在'})
+        return _json_response({'success': False, 'error': '示例文件不存在'})
 
     dest = task_dir / "input.html"
     shutil.copy(sample_html, dest)
 
     info = {'id': task_id, 'url': 'demo', 'created_at': datetime.now().isoformat(), 'status': 'building'}
-    (task_dir / 'info.json').write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding='utf-8')
+    _atomic_write_bytes(task_dir / 'info.json', _json_dumps(info))
 
-    t = threading.Thread(target=run_task, args=(task_id, 'demo', dest, 'choice', None), daemon=True)
-    t.start()
+    EXECUTOR.submit(run_task, task_id, 'demo', dest, 'choice', None)
 
-    return jsonify({'success': True, 'task_id': task_id, 'status': 'building'})
+    return _json_response({'success': True, 'task_id': task_id, 'status': 'building'})
 
 
 @app.route('/data/<path:filename>')
@@ -329,4 +535,9 @@ def serve_data(filename):
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=False)
+    # Werkzeug 开发服务器仅限调试；生产用 gunicorn（见 README）
+    if os.environ.get('FLASK_DEV'):
+        app.run(host='0.0.0.0', port=5000, debug=False)
+    else:
+        print('生产环境请使用: gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:5000 app:app')
+        print('本地调试请使用: FLASK_DEV=1 python app.py')